@@ -14,7 +14,7 @@ sudo apt upgrade -y
 
 # Install required tools and dependencies
 echo "Installing required tools and dependencies..."
-sudo apt install -y python3-flask python3-flasgger python3-pip screen default-jdk wget curl unzip
+sudo apt install -y python3-flask python3-flasgger python3-brotli python3-pip screen default-jdk wget curl unzip
 
 # Install AWS CLI
 echo "Checking if AWS CLI is installed..."
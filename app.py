@@ -5,6 +5,7 @@ import logging
 from logging.handlers import TimedRotatingFileHandler
 from dynamodb_setup import setup_dynamodb
 from endpoints import register_endpoints
+from compression import register_compression
 import os
 
 # Setup logging directory and file
@@ -55,6 +56,9 @@ except Exception as e:
 # Register all endpoints
 register_endpoints(app, table)
 
+# Compress JSON responses (gzip, or brotli when installed)
+register_compression(app)
+
 if __name__ == "__main__":
     debug_mode = os.getenv("FLASK_DEBUG", "False").lower() == "true"
     logger.info(f"Starting Flask application with debug mode = {debug_mode}.")
@@ -0,0 +1,52 @@
+import gzip
+import logging
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def compress_body(body, encoding):
+    """Compress a response body with the given content encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def choose_encoding():
+    """Pick the content encoding the client prefers among those the server supports."""
+    return request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+
+
+def register_compression(app):
+    """Compress JSON responses with gzip or brotli based on the client's Accept-Encoding."""
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+        if (
+            not response.is_json
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_SIZE:
+            return response
+
+        encoding = choose_encoding()
+        if not encoding:
+            return response
+
+        try:
+            response.set_data(compress_body(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+        except Exception as e:
+            logging.error(f"Failed to compress response with {encoding}: {e}")
+        return response
@@ -2,9 +2,11 @@ import os
 import subprocess
 import requests
 import tarfile
+import time
 import logging
 from botocore.exceptions import ClientError
 import boto3
+from utils import TIME_BUCKET_ATTRIBUTE, TIME_BUCKET_INDEX
 
 
 DYNAMODB_LOCAL_DIR = "./dynamodb-local"
@@ -12,6 +14,15 @@ DYNAMODB_LOCAL_JAR = os.path.join(DYNAMODB_LOCAL_DIR, "DynamoDBLocal.jar")
 DYNAMODB_LOCAL_DATA_DIR = os.path.join(DYNAMODB_LOCAL_DIR, "data")
 DYNAMODB_LOCAL_DOWNLOAD_URL = "https://s3.us-west-2.amazonaws.com/dynamodb-local/dynamodb_local_latest.tar.gz"
 
+TIME_BUCKET_INDEX_SCHEMA = {
+    "IndexName": TIME_BUCKET_INDEX,
+    "KeySchema": [
+        {"AttributeName": TIME_BUCKET_ATTRIBUTE, "KeyType": "HASH"},
+        {"AttributeName": "Timestamp", "KeyType": "RANGE"}
+    ],
+    "Projection": {"ProjectionType": "ALL"}
+}
+
 
 def download_dynamodb_local():
     """Download and extract DynamoDB Local if it doesn't exist."""
@@ -136,8 +147,10 @@ def ensure_table_exists(dynamodb):
                 ],
                 AttributeDefinitions=[
                     {"AttributeName": "DeviceID", "AttributeType": "S"},
-                    {"AttributeName": "Timestamp", "AttributeType": "S"}
+                    {"AttributeName": "Timestamp", "AttributeType": "S"},
+                    {"AttributeName": TIME_BUCKET_ATTRIBUTE, "AttributeType": "S"}
                 ],
+                GlobalSecondaryIndexes=[TIME_BUCKET_INDEX_SCHEMA],
                 BillingMode="PAY_PER_REQUEST"
             )
             table.meta.client.get_waiter("table_exists").wait(TableName="AirQualityData")
@@ -148,8 +161,53 @@ def ensure_table_exists(dynamodb):
     return table
 
 
+def wait_for_index_active(table, index_name, delay=10):
+    """Poll the table until the given global secondary index is ACTIVE, however long it takes."""
+    while True:
+        table.reload()
+        statuses = {index["IndexName"]: index["IndexStatus"] for index in table.global_secondary_indexes or []}
+        status = statuses.get(index_name)
+        if status is None:
+            raise Exception(f"Index '{index_name}' does not exist.")
+        if status == "ACTIVE":
+            logging.info(f"Index '{index_name}' is active.")
+            return
+        logging.info(f"Index '{index_name}' is {status}. Waiting {delay}s...")
+        time.sleep(delay)
+
+
+def ensure_time_bucket_index(table):
+    """Ensure the TimeBucketIndex exists on the table, requesting it on older tables.
+
+    This does not wait for the index to become active or backfill existing items;
+    run migrate_time_buckets.py for that.
+    """
+    existing = [index["IndexName"] for index in table.global_secondary_indexes or []]
+    if TIME_BUCKET_INDEX in existing:
+        logging.info(f"Index '{TIME_BUCKET_INDEX}' already exists.")
+        return
+
+    logging.info(f"Index '{TIME_BUCKET_INDEX}' not found. Creating...")
+    try:
+        table.update(
+            AttributeDefinitions=[
+                {"AttributeName": TIME_BUCKET_ATTRIBUTE, "AttributeType": "S"},
+                {"AttributeName": "Timestamp", "AttributeType": "S"}
+            ],
+            GlobalSecondaryIndexUpdates=[{"Create": TIME_BUCKET_INDEX_SCHEMA}]
+        )
+    except ClientError as e:
+        logging.error(f"Failed to create index '{TIME_BUCKET_INDEX}': {e}. /data/recent will be unavailable.")
+        return
+    logging.info(
+        f"Index '{TIME_BUCKET_INDEX}' creation requested. "
+        "Run migrate_time_buckets.py to backfill existing items."
+    )
+
+
 def setup_dynamodb(profile_name=None, use_local=True):
     """Set up DynamoDB and ensure table exists."""
     dynamodb = initialize_dynamodb(profile_name, use_local)
     table = ensure_table_exists(dynamodb)
+    ensure_time_bucket_index(table)
     return dynamodb, table
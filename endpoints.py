@@ -1,4 +1,6 @@
-from flask import jsonify, request
+from flask import jsonify, request, make_response
+from functools import wraps
+from datetime import datetime, timedelta, timezone
 import logging
 from utils import (
     normalize_item,
@@ -7,9 +9,36 @@ from utils import (
     get_latest_info,
     batch_delete_items,
     scan_all_items,
+    parse_timestamp,
+    canonical_timestamp,
+    time_bucket,
+    get_items_since,
+    compact_series,
+    TIME_BUCKET_ATTRIBUTE,
+    MAX_RECENT_WINDOW,
 )
 from boto3.dynamodb.conditions import Key
 
+COMPACT_MIMETYPE = "application/vnd.walle.compact+json"
+RESPONSE_FORMATS = ["json", "compact"]
+
+
+def wants_compact_format():
+    """Check whether the client asked for the compact columnar format."""
+    if request.args.get("format"):
+        return request.args.get("format") == "compact"
+    return request.accept_mimetypes.best_match(["application/json", COMPACT_MIMETYPE]) == COMPACT_MIMETYPE
+
+
+def vary_on_accept(view):
+    """Add Vary: Accept to every response of a content-negotiated endpoint."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        response.vary.add("Accept")
+        return response
+    return wrapper
+
 
 def register_endpoints(app, table):
     """Register all endpoints with the Flask app."""
@@ -154,6 +183,7 @@ def register_endpoints(app, table):
             return jsonify({"error": str(e)}), 500
 
     @app.route("/devices/<device_id>/data", methods=["GET"])
+    @vary_on_accept
     def get_device_data(device_id):
         """Get all data for a specific device
         ---
@@ -163,9 +193,20 @@ def register_endpoints(app, table):
               type: string
               required: True
               description: The device ID to fetch data for
+            - name: format
+              in: query
+              type: string
+              required: False
+              enum: [json, compact]
+              description: >
+                  Response format. "compact" returns the device ID once, a start epoch with
+                  delta-encoded second offsets, and parallel PM25/PM10 arrays. Can also be
+                  selected with "Accept: application/vnd.walle.compact+json".
         responses:
             200:
                 description: All data for the given device
+            400:
+                description: Invalid format parameter
             404:
                 description: Device not found
             500:
@@ -176,6 +217,14 @@ def register_endpoints(app, table):
             logging.error("DynamoDB connection is unavailable.")
             return jsonify({"error": "DynamoDB is unavailable"}), 500
 
+        response_format = request.args.get("format")
+        if response_format is not None and response_format not in RESPONSE_FORMATS:
+            logging.error(f"Invalid format parameter: {response_format}")
+            return jsonify({
+                "error": "Invalid format parameter",
+                "message": f"format must be one of: {', '.join(RESPONSE_FORMATS)}"
+            }), 400
+
         try:
             response = table.query(KeyConditionExpression=Key("DeviceID").eq(device_id))
             items = response.get("Items", [])
@@ -183,6 +232,12 @@ def register_endpoints(app, table):
                 logging.info(f"No data found for device {device_id}.")
                 return jsonify({"message": f"No data found for device {device_id}"}), 404
 
+            if wants_compact_format():
+                response = jsonify({"data": compact_series(device_id, items)})
+                response.mimetype = COMPACT_MIMETYPE
+                logging.info(f"Retrieved {len(items)} items for device {device_id} in compact format.")
+                return response, 200
+
             data = [normalize_item(item) for item in items]
             logging.info(f"Retrieved data for device {device_id}: {data}")
             return jsonify({"data": data}), 200
@@ -190,6 +245,68 @@ def register_endpoints(app, table):
             logging.error(f"Error retrieving data for {device_id}: {e}")
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/data/recent", methods=["GET"])
+    def get_recent_data():
+        """Get data across all devices since a given time
+        ---
+        parameters:
+            - name: since
+              in: query
+              type: string
+              required: False
+              description: >
+                  ISO 8601 timestamp to fetch data from (defaults to one hour ago).
+                  Must not be in the future or more than 30 days ago.
+        responses:
+            200:
+                description: All data across devices since the given time
+            400:
+                description: Invalid, future, or too old since parameter
+            500:
+                description: Server error
+        """
+        since_param = request.args.get("since")
+        logging.info(f"Called get_recent_data endpoint with since={since_param}.")
+        if not table:
+            logging.error("DynamoDB connection is unavailable.")
+            return jsonify({"error": "DynamoDB is unavailable"}), 500
+
+        now = datetime.now(timezone.utc)
+        try:
+            if since_param:
+                since = parse_timestamp(since_param)
+            else:
+                since = now - timedelta(hours=1)
+        except ValueError:
+            logging.error(f"Invalid since parameter: {since_param}")
+            return jsonify({
+                "error": "Invalid since parameter",
+                "message": "since must be an ISO 8601 timestamp, e.g. 2024-01-31T13:45:00Z"
+            }), 400
+
+        if since > now:
+            logging.error(f"since parameter is in the future: {since_param}")
+            return jsonify({
+                "error": "Invalid since parameter",
+                "message": "since must not be in the future"
+            }), 400
+
+        if now - since > MAX_RECENT_WINDOW:
+            logging.error(f"since parameter exceeds the maximum window: {since_param}")
+            return jsonify({
+                "error": "Invalid since parameter",
+                "message": f"since must be within the last {MAX_RECENT_WINDOW.days} days"
+            }), 400
+
+        try:
+            items = get_items_since(table, since)
+            data = [normalize_item(item) for item in items]
+            logging.info(f"Retrieved {len(data)} items since {since_param}.")
+            return jsonify({"data": data}), 200
+        except Exception as e:
+            logging.error(f"Error retrieving data since {since_param}: {e}")
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/data", methods=["POST"])
     def add_data():
         """Add new data
@@ -249,6 +366,18 @@ def register_endpoints(app, table):
                     "message": f"Required fields: {', '.join(required_fields)}"
                 }), 400
 
+            # Store the Timestamp as UTC so it sorts consistently, and tag the item
+            # with its hourly time bucket for the TimeBucketIndex
+            try:
+                data["Timestamp"] = canonical_timestamp(data["Timestamp"])
+                data[TIME_BUCKET_ATTRIBUTE] = time_bucket(data["Timestamp"])
+            except (AttributeError, TypeError, ValueError):
+                logging.error(f"Invalid Timestamp in request data: {data['Timestamp']}")
+                return jsonify({
+                    "error": "Invalid Timestamp",
+                    "message": "Timestamp must be an ISO 8601 string, e.g. 2024-01-31T13:45:00Z"
+                }), 400
+
             # Convert floats to decimals
             data = convert_floats_to_decimals(data)
 
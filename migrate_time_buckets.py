@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+from dynamodb_setup import setup_dynamodb, wait_for_index_active
+from utils import TIME_BUCKET_INDEX, backfill_time_buckets
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create the TimeBucketIndex if needed and backfill TimeBucket on existing items. "
+                    "Safe to re-run: only items missing TimeBucket are updated."
+    )
+    parser.add_argument('--remote', action='store_true', help="Use AWS DynamoDB instead of DynamoDB Local")
+    parser.add_argument('--profile', help="AWS profile name to use with --remote")
+    args = parser.parse_args()
+
+    _, table = setup_dynamodb(profile_name=args.profile, use_local=not args.remote)
+    wait_for_index_active(table, TIME_BUCKET_INDEX)
+    updated = backfill_time_buckets(table)
+    logging.info(f"Migration complete. {updated} items backfilled.")
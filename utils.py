@@ -1,8 +1,19 @@
 from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
 import logging
 import json
 
+TIME_BUCKET_ATTRIBUTE = "TimeBucket"
+TIME_BUCKET_INDEX = "TimeBucketIndex"
+TIME_BUCKET_FORMAT = "%Y-%m-%dT%H"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+MAX_BUCKET_QUERY_WORKERS = 8
+MAX_RECENT_WINDOW = timedelta(days=30)
+
 def get_air_quality_levels():
     with open('air_quality_levels.json', 'r') as json_file:
         return json.load(json_file)
@@ -15,8 +26,12 @@ def get_air_quality_info(value, pm_type_levels):
     return "Unknown", 0
 
 def normalize_item(item):
-    """Normalize DynamoDB item for JSON response."""
-    return {k: str(v) if isinstance(v, (int, float, Decimal)) else v for k, v in item.items()}
+    """Normalize DynamoDB item for JSON response, dropping internal index attributes."""
+    return {
+        k: str(v) if isinstance(v, (int, float, Decimal)) else v
+        for k, v in item.items()
+        if k != TIME_BUCKET_ATTRIBUTE
+    }
 
 
 def convert_floats_to_decimals(data):
@@ -111,3 +126,160 @@ def scan_all_items(table, projection_expression=None):
         items.extend(response.get("Items", []))
 
     return items
+
+
+def parse_timestamp(timestamp):
+    """Parse an ISO 8601 timestamp into a timezone-aware UTC datetime."""
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def canonical_timestamp(timestamp):
+    """Rewrite an ISO 8601 timestamp as a UTC 'YYYY-MM-DDTHH:MM:SSZ' string."""
+    return parse_timestamp(timestamp).strftime(TIMESTAMP_FORMAT)
+
+
+def time_bucket(timestamp):
+    """Return the hourly time bucket (e.g. '2024-01-31T13') for an ISO 8601 timestamp."""
+    return parse_timestamp(timestamp).strftime(TIME_BUCKET_FORMAT)
+
+
+def time_buckets_since(since, until=None):
+    """List every hourly time bucket between since and until (defaults to now)."""
+    until = until or datetime.now(timezone.utc)
+    current = since.replace(minute=0, second=0, microsecond=0)
+    buckets = []
+    while current <= until:
+        buckets.append(current.strftime(TIME_BUCKET_FORMAT))
+        current += timedelta(hours=1)
+    return buckets
+
+
+def query_time_bucket(client, table_name, bucket, since):
+    """Query a single time bucket on the TimeBucketIndex, supporting large data sets."""
+    deserializer = TypeDeserializer()
+    params = {
+        "TableName": table_name,
+        "IndexName": TIME_BUCKET_INDEX,
+        "KeyConditionExpression": "#bucket = :bucket AND #ts >= :since",
+        "ExpressionAttributeNames": {"#bucket": TIME_BUCKET_ATTRIBUTE, "#ts": "Timestamp"},
+        "ExpressionAttributeValues": {":bucket": {"S": bucket}, ":since": {"S": since}},
+    }
+    items = []
+    response = client.query(**params)
+    items.extend(response.get("Items", []))
+
+    while "LastEvaluatedKey" in response:
+        response = client.query(ExclusiveStartKey=response["LastEvaluatedKey"], **params)
+        items.extend(response.get("Items", []))
+
+    return [{k: deserializer.deserialize(v) for k, v in item.items()} for item in items]
+
+
+def get_items_since(table, since):
+    """Fetch all items across every device with a Timestamp at or after since.
+
+    Only the hourly buckets covering the window are queried, in parallel, through
+    the low-level client (which, unlike the Table resource, is thread-safe). Callers
+    are expected to keep since within MAX_RECENT_WINDOW.
+    """
+    try:
+        buckets = time_buckets_since(since)
+        since_str = since.strftime(TIMESTAMP_FORMAT)
+        client = table.meta.client
+        workers = max(1, min(MAX_BUCKET_QUERY_WORKERS, len(buckets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda bucket: query_time_bucket(client, table.name, bucket, since_str),
+                buckets
+            )
+            items = [item for bucket_items in results for item in bucket_items]
+
+        logging.info(f"Fetched {len(items)} items from {len(buckets)} time buckets since {since_str}.")
+        return sorted(items, key=lambda item: item["Timestamp"])
+    except Exception as e:
+        logging.error(f"Error fetching items since {since}: {e}")
+        raise
+
+
+def backfill_time_bucket_page(table, items):
+    """Write the TimeBucket attribute to one page of scanned items, returning the count updated."""
+    updated = 0
+    for item in items:
+        try:
+            bucket = time_bucket(item["Timestamp"])
+        except (AttributeError, TypeError, ValueError):
+            logging.warning(f"Skipping item with unparseable Timestamp: {item}")
+            continue
+        if canonical_timestamp(item["Timestamp"]) != item["Timestamp"]:
+            logging.warning(f"Skipping item with non-UTC Timestamp that cannot be range-queried: {item}")
+            continue
+        try:
+            table.update_item(
+                Key={"DeviceID": item["DeviceID"], "Timestamp": item["Timestamp"]},
+                UpdateExpression="SET #bucket = :bucket",
+                ConditionExpression="attribute_exists(DeviceID)",
+                ExpressionAttributeNames={"#bucket": TIME_BUCKET_ATTRIBUTE},
+                ExpressionAttributeValues={":bucket": bucket}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logging.info(f"Skipping item deleted during backfill: {item}")
+            continue
+        updated += 1
+    return updated
+
+
+def backfill_time_buckets(table):
+    """Write the TimeBucket attribute to every item that is missing it."""
+    params = {
+        "ProjectionExpression": "DeviceID, #ts",
+        "FilterExpression": "attribute_not_exists(#bucket)",
+        "ExpressionAttributeNames": {"#ts": "Timestamp", "#bucket": TIME_BUCKET_ATTRIBUTE},
+    }
+    response = table.scan(**params)
+    updated = backfill_time_bucket_page(table, response.get("Items", []))
+
+    while "LastEvaluatedKey" in response:
+        response = table.scan(ExclusiveStartKey=response["LastEvaluatedKey"], **params)
+        updated += backfill_time_bucket_page(table, response.get("Items", []))
+
+    logging.info(f"Backfilled {TIME_BUCKET_ATTRIBUTE} on {updated} items.")
+    return updated
+
+
+def optional_float(value):
+    """Convert a stored numeric value to float, passing None through."""
+    return float(value) if value is not None else None
+
+
+def compact_series(device_id, items):
+    """Encode a device's items as a columnar payload with delta-encoded timestamps.
+
+    The device ID is stored once, timestamps become a start epoch plus integer
+    second offsets from the previous reading, and PM25/PM10 become parallel
+    numeric arrays. Rows with an unparseable Timestamp or PM value are skipped.
+    """
+    rows = []
+    for item in items:
+        try:
+            epoch = int(parse_timestamp(item["Timestamp"]).timestamp())
+            rows.append((epoch, optional_float(item.get("PM25")), optional_float(item.get("PM10"))))
+        except (AttributeError, TypeError, ValueError):
+            logging.warning(f"Skipping item that cannot be compacted: {item}")
+    rows.sort(key=lambda row: row[0])
+
+    epochs = [row[0] for row in rows]
+    start = epochs[0] if epochs else None
+    offsets = [current - previous for previous, current in zip([start] + epochs, epochs)]
+    return {
+        "format": "compact",
+        "DeviceID": device_id,
+        "start": start,
+        "offsets": offsets,
+        "PM25": [row[1] for row in rows],
+        "PM10": [row[2] for row in rows],
+    }
@@ -2,6 +2,21 @@ import axios from 'axios';
 
 const BASE_URL = 'http://air.local:5000';
 
+export const decodeCompactData = (compact) => {
+    const rows = [];
+    let epoch = compact.start;
+    compact.offsets.forEach((offset, index) => {
+        epoch += offset;
+        rows.push({
+            DeviceID: compact.DeviceID,
+            Timestamp: new Date(epoch * 1000).toISOString(),
+            PM25: compact.PM25[index],
+            PM10: compact.PM10[index],
+        });
+    });
+    return rows;
+};
+
 export const getAllDevices = async () => {
     try {
         const response = await axios.get(`${BASE_URL}/devices`);
@@ -17,13 +32,17 @@ export const getDataByDeviceAndTimeframe = async (deviceId, startTime, endTime)
     console.log('Fetching data for device:', deviceId, 'Start:', startTime, 'End:', endTime);
     try {
         const response = await axios.get(`${BASE_URL}/devices/${deviceId}/data`, {
+            params: {
+                format: 'compact',
+            },
             headers: {
                 start_date: startTime,
                 end_date: endTime,
             },
         });
         console.log('getDataByDeviceAndTimeframe response:', response.data);
-        return response.data.data;
+        const { data } = response.data;
+        return data.format === 'compact' ? decodeCompactData(data) : data;
     } catch (error) {
         console.error(`Error fetching data for device ${deviceId} from ${startTime} to ${endTime}:`, error);
         throw error;